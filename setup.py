@@ -0,0 +1,29 @@
+"""Build the optional Cython FASTA scanner.
+
+Project metadata lives in ``pyproject.toml``. The extension is opt-in: set
+``VIRAL_CATALOGER_CYTHON=1`` and build where Cython is installed, for
+example with ``pip install --no-build-isolation .``. It is marked optional
+so a failed compile still installs the pure Python package.
+"""
+
+import os
+
+from setuptools import Extension, setup
+
+ext_modules = []
+if os.environ.get("VIRAL_CATALOGER_CYTHON") == "1":
+    # An explicit opt-in without Cython should fail loudly.
+    from Cython.Build import cythonize
+
+    ext_modules = cythonize(
+        [
+            Extension(
+                "viral_cataloger._fastaparser",
+                ["src/viral_cataloger/_fastaparser.pyx"],
+                optional=True,
+            )
+        ],
+        language_level=3,
+    )
+
+setup(ext_modules=ext_modules)
@@ -1,17 +1,22 @@
 """Viral genome cataloging pipeline."""
 
-from viral_cataloger.pipeline import (
-    check_external_dependencies,
-    format_skani_output,
-    greedy_star_clustering,
-    parse_fasta,
-    read_fasta_lengths,
-)
+from importlib import import_module
+from typing import Any
 
 __all__ = [
     "check_external_dependencies",
     "format_skani_output",
     "greedy_star_clustering",
     "parse_fasta",
+    "read_fasta_ids",
     "read_fasta_lengths",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    # The pipeline imports numpy, pandas and numba when installed; load it on
+    # first use so light submodules, such as the FASTA scanner imported by
+    # worker processes, stay cheap to import.
+    if name in __all__:
+        return getattr(import_module("viral_cataloger.pipeline"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
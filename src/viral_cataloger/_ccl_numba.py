@@ -0,0 +1,236 @@
+"""Numba-compiled kernels for ANI tables and similarity graphs.
+
+Importing this module requires numpy and numba (the ``fast`` extra). Callers
+in :mod:`viral_cataloger.pipeline` fall back to pure Python implementations
+when the import fails.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+import os
+
+import numpy as np
+from numba import config, njit, prange, set_num_threads
+
+
+# Argument types the pipeline passes to each kernel. Compiling exactly these
+# gives one specialization per kernel in numba's on-disk cache.
+_UNION_FIND_SIGNATURE = "int32[::1](int64[::1], int32[::1], int64, boolean)"
+_GREEDY_STAR_SIGNATURE = "int32[::1](int64[::1], int64[::1], int32[::1])"
+_FORMAT_ROWS_SIGNATURE = (
+    "int64(uint8[::1], int64[::1], uint8[::1], int64[::1], int64[:, ::1], uint8[::1])"
+)
+
+
+@lru_cache(maxsize=1)
+def warm_graph_kernels() -> None:
+    """Compile (or load from cache) both graph kernels, once per process.
+
+    Called on the first clustering call rather than at import, so importing
+    the package stays cheap for callers that never cluster.
+    """
+
+    union_find.compile(_UNION_FIND_SIGNATURE)
+    greedy_star.compile(_GREEDY_STAR_SIGNATURE)
+
+
+@lru_cache(maxsize=1)
+def _prepare_format_rows() -> None:
+    """Size numba's thread pool and compile the row formatter, once.
+
+    Slurm confines a job to its allocated CPUs, but numba sizes its thread
+    pool from every core on the node. Setting the count or compiling the
+    parallel kernel starts the pool, so this runs on first use rather than
+    at import.
+    """
+
+    slurm_cpus = os.environ.get("SLURM_CPUS_PER_TASK", "")
+    if slurm_cpus.isdigit() and int(slurm_cpus) > 0:
+        set_num_threads(min(int(slurm_cpus), config.NUMBA_NUM_THREADS))
+    _format_rows.compile(_FORMAT_ROWS_SIGNATURE)
+
+
+@njit(cache=True, inline="always")
+def _find(parent, x):
+    root = x
+    while parent[root] != root:
+        root = parent[root]
+    while parent[x] != root:
+        nxt = parent[x]
+        parent[x] = root
+        x = nxt
+    return root
+
+
+@njit(cache=True, inline="always")
+def _union(parent, rank, a, b, union_by_rank):
+    root_a = _find(parent, a)
+    root_b = _find(parent, b)
+    if root_a == root_b:
+        return
+    if not union_by_rank or rank[root_a] > rank[root_b]:
+        parent[root_b] = root_a
+    elif rank[root_a] < rank[root_b]:
+        parent[root_a] = root_b
+    else:
+        parent[root_b] = root_a
+        rank[root_a] += 1
+
+
+@njit(cache=True)
+def union_find(indptr, indices, n, union_by_rank):
+    """Return the component root of every vertex in a CSR graph."""
+
+    parent = np.arange(n, dtype=np.int32)
+    rank = np.zeros(n if union_by_rank else 0, dtype=np.int8)
+    for u in range(n):
+        for k in range(indptr[u], indptr[u + 1]):
+            # Every edge is stored in both directions; unite each pair once.
+            if indices[k] > u:
+                _union(parent, rank, u, indices[k], union_by_rank)
+    for u in range(n):
+        parent[u] = _find(parent, u)
+    return parent
+
+
+@njit(cache=True)
+def greedy_star(order, indptr, indices):
+    """Return the star-cluster representative of every vertex.
+
+    Vertices are visited in ``order``; each unassigned vertex becomes a
+    representative and claims its unassigned direct neighbors.
+    """
+
+    n = order.shape[0]
+    assigned = np.zeros(n, dtype=np.uint8)
+    rep_of = np.full(n, -1, dtype=np.int32)
+    for i in range(n):
+        rep = order[i]
+        if assigned[rep]:
+            continue
+        assigned[rep] = 1
+        rep_of[rep] = rep
+        for k in range(indptr[rep], indptr[rep + 1]):
+            neighbor = indices[k]
+            if not assigned[neighbor]:
+                assigned[neighbor] = 1
+                rep_of[neighbor] = rep
+    return rep_of
+
+
+@njit(cache=True, inline="always")
+def _threshold_state(scaled, minimum, tie_tolerance):
+    # 2 marks a product too close to a half-hundredth to round reliably.
+    if abs(scaled - np.floor(scaled) - 0.5) < tie_tolerance:
+        return 2
+    return 1 if np.rint(scaled) >= minimum else 0
+
+
+@lru_cache(maxsize=None)
+def make_threshold_filter(
+    ani_scale, ani_min, qcov_scale, qcov_min, tcov_scale, tcov_min, tie_tolerance
+):
+    """Return a kernel computing the edge states for one set of thresholds.
+
+    Each value is scaled, expressed in hundredths and rounded, then compared
+    with its minimum. Rows come back 0 (dropped), 1 (kept) or 2 when a value
+    lies within ``tie_tolerance`` of a half-hundredth and no other value
+    drops the row; callers settle those rows exactly. The scales and
+    minimums are closure constants, so numba folds them into the compiled
+    comparisons. Kernels are cached per threshold set and release the GIL
+    so chunks can be filtered from a thread pool.
+    """
+
+    @njit(nogil=True)
+    def threshold_filter(ani, qcov, tcov, qidx, tidx):
+        n = ani.shape[0]
+        states = np.zeros(n, dtype=np.uint8)
+        for i in range(n):
+            if qidx[i] < 0 or tidx[i] < 0 or qidx[i] == tidx[i]:
+                continue
+            a = _threshold_state(ani[i] * ani_scale * 100.0, ani_min, tie_tolerance)
+            q = _threshold_state(
+                qcov[i] * qcov_scale * 100.0, qcov_min, tie_tolerance
+            )
+            t = _threshold_state(
+                tcov[i] * tcov_scale * 100.0, tcov_min, tie_tolerance
+            )
+            if min(a, q, t) > 0:
+                states[i] = max(a, q, t)
+        return states
+
+    return threshold_filter
+
+
+@njit(cache=True, inline="always")
+def _write_bytes(out, pos, blob, start, end):
+    for k in range(start, end):
+        out[pos] = blob[k]
+        pos += 1
+    return pos
+
+
+@njit(cache=True, inline="always")
+def _integer_digits(cents):
+    whole = cents // 100
+    digits = 1
+    scale = 10
+    while scale <= whole:
+        digits += 1
+        scale *= 10
+    return digits
+
+
+@njit(cache=True, inline="always")
+def _write_hundredths(out, pos, cents):
+    whole = cents // 100
+    digits = _integer_digits(cents)
+    for k in range(digits - 1, -1, -1):
+        out[pos + k] = 48 + whole % 10
+        whole //= 10
+    pos += digits
+    out[pos] = 46  # "."
+    out[pos + 1] = 48 + (cents % 100) // 10
+    out[pos + 2] = 48 + cents % 10
+    return pos + 3
+
+
+@njit(cache=True, parallel=True)
+def _format_rows(q_blob, q_offsets, t_blob, t_offsets, cents, out):
+    """Write ``query\\ttarget\\t1\\tani\\tqcov\\ttcov`` rows as ASCII.
+
+    IDs are UTF-8 slices of the blobs; ``cents`` holds the three values of
+    each row in hundredths, non-negative. Row widths are measured first so
+    every row's offset is known and rows can be written in parallel.
+    Returns the bytes written.
+    """
+
+    n = cents.shape[0]
+    widths = np.zeros(n + 1, dtype=np.int64)
+    for i in prange(n):
+        # Five tabs, the hit column and the newline, plus "whole.dd" values.
+        width = 7 + q_offsets[i + 1] - q_offsets[i] + t_offsets[i + 1] - t_offsets[i]
+        for j in range(3):
+            width += _integer_digits(cents[i, j]) + 3
+        widths[i + 1] = width
+    starts = np.cumsum(widths)
+    for i in prange(n):
+        pos = _write_bytes(out, starts[i], q_blob, q_offsets[i], q_offsets[i + 1])
+        out[pos] = 9
+        pos = _write_bytes(out, pos + 1, t_blob, t_offsets[i], t_offsets[i + 1])
+        out[pos] = 9
+        out[pos + 1] = 49  # constant hit column
+        pos += 2
+        for j in range(3):
+            out[pos] = 9
+            pos = _write_hundredths(out, pos + 1, cents[i, j])
+        out[pos] = 10
+    return starts[n]
+
+
+def format_rows(q_blob, q_offsets, t_blob, t_offsets, cents, out):
+    """Run the parallel row formatter; see :func:`_format_rows`."""
+
+    _prepare_format_rows()
+    return _format_rows(q_blob, q_offsets, t_blob, t_offsets, cents, out)
@@ -0,0 +1,26 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""Cython byte scanners for FASTA records.
+
+Built only on request (see ``setup.py``); :mod:`viral_cataloger._fastascan`
+uses it when the import succeeds.
+"""
+
+
+def count_residues(const unsigned char[::1] buf, Py_ssize_t start, Py_ssize_t end):
+    """Return the number of non-whitespace bytes in ``buf[start:end]``.
+
+    Whitespace is ASCII space, tab, newline, carriage return, vertical tab
+    and form feed, matching the pure Python scanner.
+    """
+
+    cdef Py_ssize_t i
+    cdef Py_ssize_t count = 0
+    cdef unsigned char byte
+    if end > buf.shape[0]:
+        end = buf.shape[0]
+    for i in range(start, end):
+        byte = buf[i]
+        # The whitespace test of _fastascan._sequence_length, kept
+        # branch-free so the compiler can vectorize the loop.
+        count += (<unsigned char>(byte - 9) > 4) & (byte != 32)
+    return count
@@ -33,7 +33,7 @@ def build_parser() -> argparse.ArgumentParser:
         "--threads",
         type=int,
         default=4,
-        help="Number of threads to use for skani (default: 4).",
+        help="Number of threads to use for skani and ANI parsing (default: 4).",
     )
     parser.add_argument(
         "--min_ani",
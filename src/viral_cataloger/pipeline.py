@@ -2,19 +2,76 @@
 
 from __future__ import annotations
 
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
 from dataclasses import dataclass
+from itertools import accumulate
+import math
+import multiprocessing
+import os
 from pathlib import Path
 import platform
 import shutil
 import subprocess
 import sys
 import time
-from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from typing import (
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from viral_cataloger import _fastascan
+from viral_cataloger._fastascan import StrPath
 
 resource = None
 if sys.platform != "win32":  # pragma: no cover - Windows
     import resource  # type: ignore  # noqa: F401
 
+try:  # Optional acceleration, installed with the ``fast`` extra.
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None  # type: ignore[assignment]
+
+try:
+    import pandas as pd
+except ImportError:  # pragma: no cover - optional dependency
+    pd = None  # type: ignore[assignment]
+
+try:
+    from viral_cataloger import _ccl_numba
+except ImportError:  # pragma: no cover - optional dependency
+    _ccl_numba = None  # type: ignore[assignment]
+
+_COPY_BUFFER_SIZE = 1 << 20
+_LOG_TAIL_BYTES = 4096
+_FASTA_READ_BUF = 4 << 20
+# Below this many bytes in total, starting worker processes costs more than
+# scanning the files serially.
+_PARALLEL_SCAN_MIN_BYTES = 256 << 20
+# Byte table for bytes.translate: A/C/G/T in either case map to codes 0-3
+# and any other residue, such as N, to 4 (find returns -1, and -1 % 5 == 4).
+_NUCLEOTIDE_CODES = bytes(b"ACGT".find(bytes([byte]).upper()) % 5 for byte in range(256))
+_ANI_CHUNK_ROWS = 1 << 20
+# Bound on values (and their rounded hundredths) for the numba formatter,
+# whose output buffer budgets nine characters ("999999.99") per value.
+_MAX_FORMATTED_VALUE = 1e6
+_MAX_FORMATTED_CENTS = 100_000_000
+# Scaled values this close to a half-hundredth may have rounded across the
+# tie; the decimal formatter settles them.
+_TIE_TOLERANCE = 1e-6
+# Rough bytes per skani line, used to presize edge buffers.
+_ANI_BYTES_PER_ROW = 64
+
 
 @dataclass(frozen=True)
 class ClusteringParams:
@@ -26,69 +83,318 @@ class ClusteringParams:
     min_ani: float
     min_qcov: float
     min_tcov: float
+    raw_ani: bool = False
+    threads: int = 1
+
+
+@dataclass(frozen=True, eq=False)
+class PackedIds(Sequence[str]):
+    """Sequence IDs packed into one UTF-8 buffer.
+
+    ID ``i`` is ``data[offsets[i]:offsets[i + 1]]``, decoded on access, so
+    the IDs held between pipeline steps cost one buffer and eight bytes each
+    instead of one ``str`` object per sequence. Steps that need a hash
+    lookup still build one object per ID while they run: the duplicate
+    check in :func:`read_fasta_index` and the ANI loaders' ID index.
+    """
+
+    data: bytes
+    offsets: array
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):  # type: ignore[override]
+        if isinstance(idx, slice):
+            return [self[i] for i in range(len(self))[idx]]
+        return self.raw(idx).decode()
+
+    def __iter__(self) -> Iterator[str]:
+        data, offsets = self.data, self.offsets
+        for i in range(len(self)):
+            yield data[offsets[i] : offsets[i + 1]].decode()
+
+    def raw(self, idx: int) -> bytes:
+        """Return ID ``idx`` as undecoded bytes."""
+
+        idx = range(len(self))[idx]
+        return self.data[self.offsets[idx] : self.offsets[idx + 1]]
+
+    def index_map(self) -> Dict[bytes, int]:
+        """Return a mapping of raw ID bytes to position."""
+
+        data, offsets = self.data, self.offsets
+        return {data[offsets[i] : offsets[i + 1]]: i for i in range(len(self))}
+
+
+@dataclass(frozen=True)
+class EdgeGraph:
+    """Undirected similarity graph stored in compressed sparse row form.
+
+    Vertex ``i`` corresponds to ``ids[i]``; its neighbors are
+    ``indices[indptr[i]:indptr[i + 1]]``. Every edge is stored in both
+    directions.
+    """
+
+    ids: Sequence[str]
+    indptr: array
+    indices: array
+
+    @property
+    def num_edges(self) -> int:
+        """Number of undirected edges in the graph."""
+
+        return len(self.indices) // 2
+
+    def neighbors(self, idx: int) -> array:
+        """Return the neighbor indices of vertex ``idx``."""
+
+        return self.indices[self.indptr[idx] : self.indptr[idx + 1]]
 
 
 def check_external_dependencies() -> None:
     """Ensure required external tools are available."""
 
-    missing = [tool for tool in ("skani", "seqkit") if shutil.which(tool) is None]
+    missing = [tool for tool in ("skani",) if shutil.which(tool) is None]
     if missing:
         hint = (
             "Install skani from https://github.com/bluenote-1577/skani and "
-            "seqkit from https://bioinf.shenwei.me/seqkit/. "
-            "Ensure they are on your PATH."
+            "ensure it is on your PATH."
         )
         raise RuntimeError(
             f"Missing external dependencies: {', '.join(missing)}. {hint}"
         )
 
 
+def _read_log_tail(path: Path, max_bytes: int = _LOG_TAIL_BYTES) -> str:
+    """Return up to the last ``max_bytes`` of a log file."""
+
+    try:
+        with path.open("rb") as handle:
+            handle.seek(max(0, path.stat().st_size - max_bytes))
+            return handle.read().decode("utf-8", errors="replace").strip()
+    except OSError:
+        return ""
+
+
 def run_command(
     command: Sequence[str],
     error_message: str,
     stdout_path: Optional[Path] = None,
+    log_path: Optional[Path] = None,
 ) -> None:
-    """Execute a command while streaming output to file when requested."""
+    """Execute a command while streaming output to file when requested.
+
+    When ``log_path`` is given, stderr goes to that file and only its tail
+    is read back if the command fails.
+    """
 
     print(f"--> Running: {' '.join(command)}")
     try:
-        if stdout_path:
-            stdout_path.parent.mkdir(parents=True, exist_ok=True)
-            with stdout_path.open("w", encoding="utf-8") as handle:
-                subprocess.run(command, check=True, stdout=handle)
-        else:
-            subprocess.run(command, check=True)
+        with ExitStack() as stack:
+            # The child writes straight to the file descriptors; Python never
+            # buffers or decodes the streams.
+            stdout = stderr = None
+            if stdout_path:
+                stdout_path.parent.mkdir(parents=True, exist_ok=True)
+                stdout = stack.enter_context(stdout_path.open("wb"))
+            if log_path:
+                log_path.parent.mkdir(parents=True, exist_ok=True)
+                stderr = stack.enter_context(log_path.open("wb"))
+            subprocess.run(command, check=True, stdout=stdout, stderr=stderr)
     except subprocess.CalledProcessError as exc:
-        raise RuntimeError(
-            f"{error_message} Command failed: {' '.join(command)}"
-        ) from exc
+        message = f"{error_message} Command failed: {' '.join(command)}"
+        tail = _read_log_tail(log_path) if log_path else ""
+        if tail:
+            message += f"\nLast lines of {log_path}:\n{tail}"
+        raise RuntimeError(message) from exc
 
 
-def parse_fasta(path: Path) -> Iterator[Tuple[str, str]]:
-    """Yield (sequence_id, sequence) tuples from a FASTA file."""
+def parse_fasta(path: StrPath) -> Iterator[Tuple[str, str]]:
+    """Yield (sequence_id, sequence) tuples from a FASTA file.
+
+    Records are plain tuples rather than record objects. ``sequence_id`` is
+    the first word of the header, and whitespace is removed from sequences.
+    """
+
+    for header, body in _fastascan.iter_records(path):
+        yield (
+            _fastascan.header_id(header).decode(),
+            body.translate(None, _fastascan.FASTA_WHITESPACE).decode(),
+        )
+
+
+def parse_fasta_arrays(
+    path: StrPath, encode: bool = False
+) -> Tuple[PackedIds, array, bytearray]:
+    """Parse a FASTA file into parallel arrays instead of per-record tuples.
+
+    Returns ``(ids, offsets, sequences)``. All sequences share one buffer;
+    record ``i`` is ``sequences[offsets[i]:offsets[i + 1]]``, so bulk passes
+    (or ``numpy.frombuffer``) can read them without per-record objects.
+    Records keep file order, duplicates included, as in :func:`parse_fasta`.
+
+    With ``encode=True`` the buffer holds nucleotide codes instead of
+    letters: A, C, G and T (either case) become 0-3 and anything else 4.
+    The codes are produced in the same translate pass that strips
+    whitespace.
+    """
 
-    seq_id: Optional[str] = None
-    seq_chunks: List[str] = []
-    with path.open("r", encoding="utf-8") as handle:
+    id_data = bytearray()
+    id_offsets = array("q", [0])
+    sequences = bytearray()
+    offsets = array("q", [0])
+    for header, body in _fastascan.iter_records(path):
+        id_data += _fastascan.header_id(header)
+        id_offsets.append(len(id_data))
+        sequences += body.translate(
+            _NUCLEOTIDE_CODES if encode else None, _fastascan.FASTA_WHITESPACE
+        )
+        offsets.append(len(sequences))
+    return PackedIds(bytes(id_data), id_offsets), offsets, sequences
+
+
+def read_fasta_ids(path: StrPath) -> Iterator[str]:
+    """Yield the ID of every FASTA record without reading sequences."""
+
+    with open(path, "rb", buffering=_FASTA_READ_BUF) as handle:
         for line in handle:
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith(">"):
-                if seq_id is not None:
-                    yield seq_id, "".join(seq_chunks)
-                seq_id = line.split()[0][1:]
-                seq_chunks = []
-            else:
-                seq_chunks.append(line)
-        if seq_id is not None:
-            yield seq_id, "".join(seq_chunks)
+            # Indexing yields an int, which is cheaper than a one-byte slice.
+            if line and line[0] == 0x3E:  # ">"
+                yield _fastascan.header_id(line[1:]).decode()
+
+
+def _fasta_stamp(path: StrPath) -> bytes:
+    """Return the first line of a lengths cache describing ``path``."""
+
+    stat = os.stat(path)
+    return b"# %d\t%d\n" % (stat.st_size, stat.st_mtime_ns)
+
+
+def _load_lengths_cache(
+    stamp: bytes, cache_path: StrPath
+) -> Optional[Tuple[PackedIds, array]]:
+    """Return a cached index when ``cache_path`` matches ``stamp``."""
+
+    try:
+        with open(cache_path, "rb") as handle:
+            if handle.readline() != stamp:
+                return None
+            data = bytearray()
+            offsets = array("q", [0])
+            lengths = array("q")
+            for line in handle:
+                seq_id, length = line.split(b"\t")
+                data += seq_id
+                offsets.append(len(data))
+                lengths.append(int(length))
+    except (OSError, ValueError):
+        return None
+    return PackedIds(bytes(data), offsets), lengths
 
 
-def read_fasta_lengths(path: Path) -> Dict[str, int]:
-    """Return a mapping of sequence ID to sequence length."""
+def _write_lengths_cache(
+    stamp: bytes, cache_path: StrPath, ids: PackedIds, lengths: array
+) -> None:
+    """Write an ``id<TAB>length`` sidecar, ignoring unwritable locations."""
+
+    cache_path = Path(cache_path)
+    tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        with tmp_path.open("wb") as handle:
+            handle.write(stamp)
+            handle.writelines(
+                b"%s\t%d\n" % (ids.raw(idx), length)
+                for idx, length in enumerate(lengths)
+            )
+        # Readers see either the old cache or the complete new one.
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
 
-    return {seq_id: len(seq) for seq_id, seq in parse_fasta(path)}
+
+def read_fasta_index(
+    path: StrPath, cache_path: Optional[StrPath] = None
+) -> Tuple[PackedIds, array]:
+    """Return sequence IDs and their lengths in a single binary pass.
+
+    Sequences are never decoded or joined; residues are counted directly in
+    each record's bytes. Duplicate IDs keep their first position and the
+    last record's length, matching :func:`read_fasta_lengths`.
+
+    When ``cache_path`` is given, the result is stored there as a TSV keyed
+    by the FASTA size and modification time, and reused by later calls
+    until the file changes.
+    """
+
+    if cache_path is not None:
+        stamp = _fasta_stamp(path)
+        cached = _load_lengths_cache(stamp, cache_path)
+        if cached is not None:
+            return cached
+
+    data = bytearray()
+    offsets = array("q", [0])
+    lengths = array("q")
+    id_to_idx: Dict[bytes, int] = {}
+    for header, length in _fastascan.iter_lengths(path):
+        seq_id = _fastascan.header_id(header)
+        idx = id_to_idx.setdefault(seq_id, len(lengths))
+        if idx == len(lengths):
+            data += seq_id
+            offsets.append(len(data))
+            lengths.append(length)
+        else:
+            lengths[idx] = length
+    ids = PackedIds(bytes(data), offsets)
+    if cache_path is not None:
+        _write_lengths_cache(stamp, cache_path, ids, lengths)
+    return ids, lengths
+
+
+def read_fasta_lengths(
+    path: StrPath, cache_path: Optional[StrPath] = None
+) -> Dict[str, int]:
+    """Return a mapping of sequence ID to sequence length.
+
+    ``cache_path`` enables the sidecar cache of :func:`read_fasta_index`.
+    """
+
+    ids, lengths = read_fasta_index(path, cache_path)
+    return dict(zip(ids, lengths))
+
+
+def read_many_fasta_lengths(
+    paths: Iterable[StrPath], workers: Optional[int] = None
+) -> Dict[StrPath, Dict[str, int]]:
+    """Return :func:`read_fasta_lengths` for each path, scanning in parallel.
+
+    Files are spread over a process pool of ``workers`` processes (default:
+    one per CPU), since scanning is CPU-bound and holds the GIL. Inputs
+    under 256 MiB in total are scanned serially. Workers are started with
+    ``spawn``, which re-imports the calling script in each of them, so a
+    script must guard its entry point with ``if __name__ == "__main__":``.
+    """
+
+    paths = list(paths)
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if (
+        workers <= 1
+        or sum(map(os.path.getsize, paths)) < _PARALLEL_SCAN_MIN_BYTES
+    ):
+        return {path: read_fasta_lengths(path) for path in paths}
+    # Spawned workers never inherit numba or executor threads, which a fork
+    # of this process could deadlock on, and the scanner module they import
+    # leaves out pandas and numba.
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        results = executor.map(
+            _fastascan.lengths_by_id,
+            paths,
+            chunksize=max(1, len(paths) // (4 * workers)),
+        )
+        return dict(zip(paths, results))
 
 
 def max_mem_usage_gb() -> Optional[float]:
@@ -113,18 +419,146 @@ def aggregate_fastas(input_dir: Path, output_path: Path) -> List[Path]:
             f"No FASTA files (*.fa, *.fasta, *.fna) found in '{input_dir}'."
         )
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as outfile:
+    with output_path.open("wb") as outfile:
         for fasta_path in fasta_files:
-            outfile.write(fasta_path.read_text(encoding="utf-8"))
+            with fasta_path.open("rb") as infile:
+                shutil.copyfileobj(infile, outfile, _COPY_BUFFER_SIZE)
+                # Guard against a missing final newline gluing the last
+                # sequence line onto the next file's header.
+                if infile.tell() > 0:
+                    infile.seek(-1, 2)
+                    if infile.read(1) != b"\n":
+                        outfile.write(b"\n")
     return fasta_files
 
 
+def _read_ani_table(
+    path: Path,
+    columns: Sequence[int],
+    skiprows: int = 0,
+    chunksize: Optional[int] = None,
+):
+    """Parse whitespace-delimited ANI columns with the pandas C tokenizer.
+
+    The first two selected columns are sequence IDs and the rest are floats.
+    Returns a DataFrame, or an iterator of DataFrames when ``chunksize`` is
+    set. Empty or malformed tables raise ``ValueError``, in which case
+    callers fall back to their line-by-line parser.
+    """
+
+    dtypes = {col: ("float64" if pos > 1 else str) for pos, col in enumerate(columns)}
+    return pd.read_csv(
+        path,
+        sep=r"\s+",
+        header=None,
+        skiprows=skiprows,
+        usecols=list(columns),
+        dtype=dtypes,
+        keep_default_na=False,
+        engine="c",
+        chunksize=chunksize,
+    )
+
+
+def _rounded_hundredths(values: "np.ndarray") -> "np.ndarray":
+    """Return ``values * 100`` rounded as ``"%.2f"`` rounds each value.
+
+    The vectorized form of :func:`_hundredths`. The result stays float64 so
+    non-finite values pass through.
+    """
+
+    scaled = values * 100
+    hundredths = np.rint(scaled)
+    with np.errstate(invalid="ignore"):
+        near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < _TIE_TOLERANCE
+    for idx in np.flatnonzero(near_tie):
+        hundredths.flat[idx] = _exact_hundredths(values.flat[idx])
+    return hundredths
+
+
+def _to_hundredths(values: "np.ndarray") -> Optional["np.ndarray"]:
+    """Round values to integer hundredths exactly as ``"%.2f"`` would.
+
+    Returns ``None`` when a value is negative, non-finite or too large for
+    the scaled product to resolve ties, so callers can use a formatter that
+    handles it.
+    """
+
+    if not np.all((values >= 0) & (values < _MAX_FORMATTED_VALUE)):
+        return None
+    cents = _rounded_hundredths(values).astype(np.int64, order="C")
+    # Values just below the bound can round up to it (999999.999 -> 1000000.00).
+    if cents.size and cents.max() >= _MAX_FORMATTED_CENTS:
+        return None
+    return cents
+
+
+def _pack_strings(values: Iterable[str]) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Return strings as one UTF-8 byte array plus ``len + 1`` offsets."""
+
+    encoded = [value.encode() for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(
+        np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)),
+        out=offsets[1:],
+    )
+    # A bytearray keeps the view writable, matching the kernel signature.
+    return np.frombuffer(bytearray().join(encoded), dtype=np.uint8), offsets
+
+
+def _write_formatted_rows(frame, handle: BinaryIO) -> bool:
+    """Write a scaled skani frame through the numba row formatter.
+
+    Returns ``False`` without writing when a value is outside the range the
+    kernel formats exactly.
+    """
+
+    cents = _to_hundredths(frame[[2, 3, 4]].to_numpy(dtype=np.float64))
+    if cents is None:
+        return False
+    q_blob, q_offsets = _pack_strings(frame[0])
+    t_blob, t_offsets = _pack_strings(frame[1])
+    # Per row: five tabs, the hit column, a newline and three values of at
+    # most six integer digits plus ".dd".
+    out = np.empty(
+        len(q_blob) + len(t_blob) + len(frame) * 34, dtype=np.uint8
+    )
+    size = _ccl_numba.format_rows(q_blob, q_offsets, t_blob, t_offsets, cents, out)
+    handle.write(out[:size].data)
+    return True
+
+
 def format_skani_output(input_path: Path, output_path: Path) -> None:
     """Reformat skani edge list output into clustering-ready columns."""
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
+    if pd is not None:
+        try:
+            with output_path.open("wb") as handle:
+                for frame in _read_ani_table(
+                    input_path, range(5), skiprows=1, chunksize=_ANI_CHUNK_ROWS
+                ):
+                    frame[[3, 4]] *= 100
+                    if _ccl_numba is not None and _write_formatted_rows(
+                        frame, handle
+                    ):
+                        continue
+                    frame.insert(2, "hit", 1)
+                    frame.to_csv(
+                        handle,
+                        sep="\t",
+                        header=False,
+                        index=False,
+                        float_format="%.2f",
+                        lineterminator="\n",
+                    )
+            return
+        except ValueError:
+            # The line parser below rewrites the file from the start.
+            pass
+    # Every writer emits "\n" line endings, whatever the platform default.
     with input_path.open("r", encoding="utf-8") as infile, output_path.open(
-        "w", encoding="utf-8"
+        "w", encoding="utf-8", newline="\n"
     ) as outfile:
         header = infile.readline()
         if not header:
@@ -145,70 +579,487 @@ def format_skani_output(input_path: Path, output_path: Path) -> None:
             )
 
 
-def load_ani_edges(
+def _edges_to_csr(
+    src: Sequence[int], dst: Sequence[int], n: int
+) -> Tuple[array, array]:
+    """Convert an undirected edge list into CSR ``(indptr, indices)`` arrays."""
+
+    if np is not None:
+        src_arr = np.asarray(src, dtype=np.int32)
+        dst_arr = np.asarray(dst, dtype=np.int32)
+        heads = np.concatenate((src_arr, dst_arr))
+        tails = np.concatenate((dst_arr, src_arr))
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(heads, minlength=n), out=indptr[1:])
+        indices = tails[np.argsort(heads, kind="stable")]
+        return array("q", indptr.tobytes()), array("i", indices.tobytes())
+
+    counts = [0] * (n + 1)
+    for u in src:
+        counts[u + 1] += 1
+    for v in dst:
+        counts[v + 1] += 1
+    indptr = array("q", accumulate(counts))
+    indices = array("i", bytes(array("i").itemsize * indptr[-1]))
+    fill = list(indptr[:-1])
+    for u, v in zip(src, dst):
+        indices[fill[u]] = v
+        fill[u] += 1
+        indices[fill[v]] = u
+        fill[v] += 1
+    return indptr, indices
+
+
+def _exact_hundredths(value: float) -> float:
+    """Return ``value`` in hundredths, rounded by the ``"%.2f"`` formatter."""
+
+    return float(f"{value:.2f}".replace(".", ""))
+
+
+def _hundredths(value: float) -> float:
+    """Return ``value * 100`` rounded as ``"%.2f"`` rounds ``value``.
+
+    Only products near a half-hundredth go through the decimal formatter;
+    non-finite values are returned scaled.
+    """
+
+    scaled = value * 100
+    try:
+        nearest = round(scaled)
+    except (OverflowError, ValueError):
+        return scaled
+    if abs(abs(scaled - nearest) - 0.5) < _TIE_TOLERANCE:
+        return _exact_hundredths(value)
+    return nearest
+
+
+def _min_hundredths(threshold: float) -> int:
+    """Return the fewest hundredths whose two-decimal value meets ``threshold``.
+
+    Two-decimal text parses to the double nearest ``cents / 100``, so this
+    matches comparing ``float("%.2f" % value) >= threshold``.
+    """
+
+    cents = math.floor(threshold * 100) - 1
+    while cents / 100 < threshold:
+        cents += 1
+    return cents
+
+
+def _quantize_thresholds(
+    min_ani: float, min_qcov: float, min_tcov: float, cov_scale: float
+) -> Tuple[Tuple[float, int], Tuple[float, int], Tuple[float, int]]:
+    """Return ``(scale, minimum)`` pairs for the ANI, qcov and tcov columns.
+
+    A column value times its scale is the percentage
+    :func:`format_skani_output` writes with ``"%.2f"``; the row passes when
+    that percentage, in hundredths and rounded the same way, reaches the
+    minimum. Edges are therefore the ones thresholding the formatted table
+    would keep.
+    """
+
+    return (
+        (1.0, _min_hundredths(min_ani)),
+        (cov_scale, _min_hundredths(min_qcov)),
+        (cov_scale, _min_hundredths(min_tcov)),
+    )
+
+
+def _filter_ani_chunk(
+    frame: "pd.DataFrame",
+    id_index: "pd.Index",
+    columns: Tuple[int, int, int, int, int],
+    thresholds: Tuple[Tuple[float, int], ...],
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Return the (query, target) vertex indices of rows passing thresholds."""
+
+    q_col, t_col = columns[:2]
+    qidx = id_index.get_indexer(frame[q_col])
+    tidx = id_index.get_indexer(frame[t_col])
+    values = [frame[col].to_numpy(dtype=np.float64) for col in columns[2:]]
+    if _ccl_numba is not None:
+        threshold_filter = _ccl_numba.make_threshold_filter(
+            *(term for pair in thresholds for term in pair), _TIE_TOLERANCE
+        )
+        states = threshold_filter(*values, qidx, tidx)
+        # The kernel leaves values near a rounding tie undecided (2).
+        for row in np.flatnonzero(states == 2):
+            states[row] = all(
+                _exact_hundredths(column[row] * scale) >= minimum
+                for column, (scale, minimum) in zip(values, thresholds)
+            )
+        mask = states.view(np.bool_)
+    else:
+        # Fold every predicate into one mask in place, reusing a single
+        # scratch buffer instead of allocating a temporary per comparison.
+        mask = np.not_equal(qidx, tidx)
+        scratch = np.empty_like(mask)
+        mask &= np.greater_equal(np.minimum(qidx, tidx), 0, out=scratch)
+        for column, (scale, minimum) in zip(values, thresholds):
+            hundredths = _rounded_hundredths(np.multiply(column, scale))
+            mask &= np.greater_equal(hundredths, minimum, out=scratch)
+    return (
+        np.compress(mask, qidx).astype(np.int32),
+        np.compress(mask, tidx).astype(np.int32),
+    )
+
+
+def _filter_ani_chunks(
+    path: Path,
+    columns: Tuple[int, int, int, int, int],
+    skip_header: bool,
+    thresholds: Tuple[Tuple[float, int], ...],
+    ids: Sequence[str],
+    threads: int,
+) -> Optional[Tuple["np.ndarray", "np.ndarray"]]:
+    """Filter an ANI table chunk by chunk across a thread pool.
+
+    pandas parses each chunk in C and the threshold masks release the GIL,
+    so threads overlap filtering with parsing of the next chunk without
+    pickling frames between processes. Returns ``None`` when the table
+    cannot be parsed by pandas.
+    """
+
+    id_index = pd.Index(list(ids))
+    # A lookup builds the index hash table up front, so worker threads only
+    # read it instead of racing to populate it.
+    id_index.get_indexer(id_index[:1])
+    # Size the edge buffers from the table size so they rarely grow; chunks
+    # are copied in, in order, as they finish.
+    capacity = max(1024, path.stat().st_size // _ANI_BYTES_PER_ROW)
+    src = np.empty(capacity, dtype=np.int32)
+    dst = np.empty(capacity, dtype=np.int32)
+    fill = 0
+
+    def collect(future) -> None:
+        nonlocal src, dst, fill
+        chunk_src, chunk_dst = future.result()
+        end = fill + len(chunk_src)
+        if end > len(src):
+            capacity = max(end, int(len(src) * 1.5))
+            src = np.resize(src, capacity)
+            dst = np.resize(dst, capacity)
+        src[fill:end] = chunk_src
+        dst[fill:end] = chunk_dst
+        fill = end
+
+    threads = max(1, threads)
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            # Bound the chunks in flight so parsing never runs far ahead of
+            # filtering and the whole table is never held in memory.
+            pending: deque = deque()
+            for chunk in _read_ani_table(
+                path,
+                columns,
+                skiprows=int(skip_header),
+                chunksize=_ANI_CHUNK_ROWS,
+            ):
+                if len(pending) >= 2 * threads:
+                    collect(pending.popleft())
+                pending.append(
+                    executor.submit(
+                        _filter_ani_chunk, chunk, id_index, columns, thresholds
+                    )
+                )
+            while pending:
+                collect(pending.popleft())
+    except ValueError:
+        return None
+    return src[:fill], dst[:fill]
+
+
+def _load_edge_graph(
     path: Path,
+    columns: Tuple[int, int, int, int, int],
+    skip_header: bool,
+    cov_scale: float,
     min_ani: float,
     min_qcov: float,
     min_tcov: float,
     valid_ids: Iterable[str],
-) -> Dict[str, List[str]]:
-    """Load ANI edges that meet thresholds."""
+    threads: int = 1,
+) -> EdgeGraph:
+    """Load edges whose (query, target, ani, qcov, tcov) columns pass thresholds.
+
+    Thresholds are percentages; coverage values are multiplied by
+    ``cov_scale`` to express them as percentages too.
+    """
+
+    ids: Sequence[str] = (
+        valid_ids
+        if isinstance(valid_ids, PackedIds)
+        else list(dict.fromkeys(valid_ids))
+    )
+    thresholds = _quantize_thresholds(min_ani, min_qcov, min_tcov, cov_scale)
+    if pd is not None:
+        filtered = _filter_ani_chunks(
+            path, columns, skip_header, thresholds, ids, threads
+        )
+        if filtered is not None:
+            indptr, indices = _edges_to_csr(*filtered, len(ids))
+            return EdgeGraph(ids=ids, indptr=indptr, indices=indices)
 
-    valid_set = set(valid_ids)
-    edges: Dict[str, List[str]] = {seq_id: [] for seq_id in valid_set}
-    with path.open("r", encoding="utf-8") as handle:
+    q_col, t_col, ani_col, qcov_col, tcov_col = columns
+    (ani_scale, ani_min), (qcov_scale, qcov_min), (tcov_scale, tcov_min) = (
+        thresholds
+    )
+    # Keys stay as bytes so lines never need decoding.
+    id_to_idx = (
+        ids.index_map()
+        if isinstance(ids, PackedIds)
+        else {seq_id.encode(): idx for idx, seq_id in enumerate(ids)}
+    )
+    max_split = max(columns) + 1
+    # Flat int32 buffers keep each edge at 8 bytes instead of two list slots
+    # holding Python ints.
+    src = array("i")
+    dst = array("i")
+    with path.open("rb") as handle:
+        if skip_header:
+            handle.readline()
         for line in handle:
-            parts = line.strip().split()
-            if len(parts) < 6:
+            parts = line.split(None, max_split)
+            if len(parts) < max_split:
                 continue
-            qname, tname, _, ani, qcov, tcov = parts[:6]
-            if qname == tname or qname not in valid_set or tname not in valid_set:
+            qidx = id_to_idx.get(parts[q_col])
+            tidx = id_to_idx.get(parts[t_col])
+            if qidx is None or tidx is None or qidx == tidx:
                 continue
             try:
                 if (
-                    float(ani) >= min_ani
-                    and float(qcov) >= min_qcov
-                    and float(tcov) >= min_tcov
+                    _hundredths(float(parts[ani_col]) * ani_scale) >= ani_min
+                    and _hundredths(float(parts[qcov_col]) * qcov_scale) >= qcov_min
+                    and _hundredths(float(parts[tcov_col]) * tcov_scale) >= tcov_min
                 ):
-                    edges[qname].append(tname)
-                    edges[tname].append(qname)
-            except ValueError:
+                    src.append(qidx)
+                    dst.append(tidx)
+            except (ValueError, OverflowError):
                 continue
-    return edges
+    indptr, indices = _edges_to_csr(src, dst, len(ids))
+    return EdgeGraph(ids=ids, indptr=indptr, indices=indices)
+
+
+def load_ani_edges(
+    path: Path,
+    min_ani: float,
+    min_qcov: float,
+    min_tcov: float,
+    valid_ids: Iterable[str],
+    threads: int = 1,
+) -> EdgeGraph:
+    """Load ANI edges that meet thresholds into a CSR similarity graph.
+
+    ``path`` is a table written by :func:`format_skani_output`.
+    """
+
+    return _load_edge_graph(
+        path,
+        (0, 1, 3, 4, 5),
+        False,
+        1.0,
+        min_ani,
+        min_qcov,
+        min_tcov,
+        valid_ids,
+        threads,
+    )
+
+
+def load_ani_edges_raw(
+    path: Path,
+    min_ani: float,
+    min_qcov: float,
+    min_tcov: float,
+    valid_ids: Iterable[str],
+    threads: int = 1,
+) -> EdgeGraph:
+    """Load ANI edges straight from skani output without reformatting.
+
+    skani reports coverage as fractions; they are scaled to percentages
+    during comparison, giving the same edges as reformatting the table
+    with :func:`format_skani_output` and calling :func:`load_ani_edges`.
+    """
+
+    return _load_edge_graph(
+        path,
+        (0, 1, 2, 3, 4),
+        True,
+        100.0,
+        min_ani,
+        min_qcov,
+        min_tcov,
+        valid_ids,
+        threads,
+    )
+
+
+def _length_order(lengths: Sequence[int], ids: Sequence[str]) -> List[int]:
+    """Return vertex indices by descending length, ties broken by ID.
+
+    Only IDs that share a length are compared. :class:`PackedIds` are
+    compared as raw UTF-8, whose byte order matches the code point order of
+    the decoded strings, so IDs are never decoded here.
+    """
+
+    n = len(ids)
+    if np is not None:
+        lengths_arr = np.asarray(lengths, dtype=np.int64)
+        order_arr = np.argsort(-lengths_arr, kind="stable")
+        run_starts = np.flatnonzero(np.diff(lengths_arr[order_arr])) + 1
+        bounds = np.concatenate(([0], run_starts, [n]))
+        tied = np.flatnonzero(np.diff(bounds) > 1)
+        runs = zip(bounds[tied].tolist(), bounds[tied + 1].tolist())
+        order = order_arr.tolist()
+    else:
+        # reverse=True keeps the sort stable, so ties stay in index order.
+        order = sorted(range(n), key=lengths.__getitem__, reverse=True)
+        runs = []
+        start = 0
+        for end in range(1, n + 1):
+            if end == n or lengths[order[end]] != lengths[order[start]]:
+                if end - start > 1:
+                    runs.append((start, end))
+                start = end
+    key = ids.raw if isinstance(ids, PackedIds) else ids.__getitem__
+    for start, end in runs:
+        order[start:end] = sorted(order[start:end], key=key)
+    return order
 
 
 def greedy_star_clustering(
-    seq_lengths: Dict[str, int],
-    edges: Dict[str, List[str]],
+    seq_lengths: Union[Mapping[str, int], Sequence[int]],
+    edges: EdgeGraph,
 ) -> Dict[str, List[str]]:
     """Cluster sequences using greedy representative (star topology).
 
     Assumes edges only represent direct ANI + coverage matches. Clusters are
     built by choosing the longest unassigned genome as representative and
     assigning only genomes directly connected to that representative.
+    ``seq_lengths`` is either a mapping of ID to length or a sequence of
+    lengths aligned with ``edges.ids``.
     """
 
-    seqs_sorted = sorted(
-        seq_lengths.keys(), key=lambda seq: (-seq_lengths[seq], seq)
-    )
-    unassigned = set(seqs_sorted)
+    ids = edges.ids
+    if isinstance(seq_lengths, Mapping):
+        lengths: Sequence[int] = array(
+            "q", (seq_lengths[seq_id] for seq_id in ids)
+        )
+    else:
+        lengths = seq_lengths
+    order = _length_order(lengths, ids)
+    if _ccl_numba is not None:
+        _ccl_numba.warm_graph_kernels()
+        rep_of: Sequence[int] = _ccl_numba.greedy_star(
+            np.asarray(order, dtype=np.int64),
+            np.frombuffer(edges.indptr, dtype=np.int64),
+            np.frombuffer(edges.indices, dtype=np.int32),
+        ).tolist()
+    else:
+        rep_of = _greedy_star_labels(order, edges)
+
+    # Walking in length order lists each representative first and its
+    # members in the same (-length, id) order used to pick seeds.
     clusters: Dict[str, List[str]] = {}
+    for idx in order:
+        clusters.setdefault(ids[rep_of[idx]], []).append(ids[idx])
+    return clusters
+
 
-    for seq_id in seqs_sorted:
-        if seq_id not in unassigned:
+def _greedy_star_labels(order: Sequence[int], edges: EdgeGraph) -> List[int]:
+    """Return the representative index assigned to every vertex."""
+
+    indptr, indices = edges.indptr, edges.indices
+    assigned = bytearray(len(order))
+    rep_of = [-1] * len(order)
+    for rep in order:
+        if assigned[rep]:
             continue
-        unassigned.remove(seq_id)
-        neighbor_list = sorted(
-            (neighbor for neighbor in edges.get(seq_id, []) if neighbor in unassigned),
-            key=lambda neighbor: (-seq_lengths[neighbor], neighbor),
+        assigned[rep] = 1
+        rep_of[rep] = rep
+        for neighbor in indices[indptr[rep] : indptr[rep + 1]]:
+            if not assigned[neighbor]:
+                assigned[neighbor] = 1
+                rep_of[neighbor] = rep
+    return rep_of
+
+
+def _find_root(parent: array, x: int) -> int:
+    """Return the root of ``x``, compressing the path in a second pass."""
+
+    root = x
+    while parent[root] != root:
+        root = parent[root]
+    while parent[x] != root:
+        parent[x], x = root, parent[x]
+    return root
+
+
+def _component_labels(edges: EdgeGraph, union_by_rank: bool = True) -> Sequence[int]:
+    """Return the union-find root of every vertex in ``edges``.
+
+    Each undirected edge is stored twice in the CSR arrays, so only the
+    ``u < v`` half is united. Disabling ``union_by_rank`` drops the rank
+    array at the cost of possibly deeper trees before compression.
+    """
+
+    n = len(edges.ids)
+    if _ccl_numba is not None:
+        _ccl_numba.warm_graph_kernels()
+        return _ccl_numba.union_find(
+            np.frombuffer(edges.indptr, dtype=np.int64),
+            np.frombuffer(edges.indices, dtype=np.int32),
+            n,
+            union_by_rank,
         )
-        cluster_members = [seq_id]
-        for neighbor in neighbor_list:
-            if neighbor in unassigned:
-                unassigned.remove(neighbor)
-                cluster_members.append(neighbor)
-        clusters[seq_id] = cluster_members
-    return clusters
+
+    parent = array("i", range(n))
+    rank = bytearray(n) if union_by_rank else None
+    indptr, indices = edges.indptr, edges.indices
+    for u in range(n):
+        for v in indices[indptr[u] : indptr[u + 1]]:
+            if v <= u:
+                continue
+            root_u = _find_root(parent, u)
+            root_v = _find_root(parent, v)
+            if root_u == root_v:
+                continue
+            if rank is None or rank[root_u] > rank[root_v]:
+                parent[root_v] = root_u
+            elif rank[root_u] < rank[root_v]:
+                parent[root_u] = root_v
+            else:
+                parent[root_v] = root_u
+                rank[root_u] += 1
+    return [_find_root(parent, u) for u in range(n)]
+
+
+def connected_components(
+    edges: EdgeGraph, union_by_rank: bool = True
+) -> Dict[str, List[str]]:
+    """Group sequences transitively into connected components.
+
+    Unlike :func:`greedy_star_clustering` this allows chaining; it is used to
+    report how many clusters transitive clustering would have produced.
+    """
+
+    components: Dict[int, List[str]] = {}
+    for seq_id, root in zip(edges.ids, _component_labels(edges, union_by_rank)):
+        components.setdefault(int(root), []).append(seq_id)
+    return {members[0]: members for members in components.values()}
+
+
+def component_sizes(edges: EdgeGraph, union_by_rank: bool = True) -> List[int]:
+    """Return connected component sizes without materializing member lists."""
+
+    labels = _component_labels(edges, union_by_rank)
+    if np is not None:
+        counts = np.bincount(np.asarray(labels), minlength=len(edges.ids))
+        return counts[counts > 0].tolist()
+    counts = [0] * len(edges.ids)
+    for root in labels:
+        counts[root] += 1
+    return [count for count in counts if count]
 
 
 def write_clusters(path: Path, clusters: Dict[str, List[str]]) -> None:
@@ -220,18 +1071,30 @@ def write_clusters(path: Path, clusters: Dict[str, List[str]]) -> None:
             out_handle.write(f"{rep_id}\t{','.join(members)}\n")
 
 
-def write_representative_ids(path: Path, clusters: Dict[str, List[str]]) -> None:
-    """Write representative IDs to file."""
+def extract_representatives(
+    fasta_path: StrPath, rep_ids: Iterable[str], output_path: StrPath
+) -> int:
+    """Copy records whose ID is in ``rep_ids`` to ``output_path``.
+
+    Returns the number of records written.
+    """
 
-    with path.open("w", encoding="utf-8") as handle:
-        for rep_id in clusters:
-            handle.write(f"{rep_id}\n")
+    wanted = {seq_id.encode() for seq_id in rep_ids}
+    written = 0
+    with _fastascan.mapped(fasta_path) as buf, open(output_path, "wb") as outfile:
+        with memoryview(buf) as view:
+            for start, header_end, end in _fastascan.record_spans(buf):
+                if _fastascan.header_id(buf[start + 1 : header_end]) in wanted:
+                    outfile.write(view[start:end])
+                    written += 1
+    return written
 
 
-def count_fasta_records(path: Path) -> int:
+def count_fasta_records(path: StrPath) -> int:
     """Count FASTA records in a file."""
 
-    return sum(1 for _ in parse_fasta(path))
+    with _fastascan.mapped(path) as buf:
+        return sum(1 for _ in _fastascan.record_spans(buf))
 
 
 def perform_clustering(params: ClusteringParams) -> Dict[str, List[str]]:
@@ -239,21 +1102,20 @@ def perform_clustering(params: ClusteringParams) -> Dict[str, List[str]]:
 
     start_time = time.time()
     print("--> Reading and sorting sequences by length...")
-    seq_lengths = read_fasta_lengths(params.fna)
-    print(f"    {len(seq_lengths)} sequences loaded for clustering.")
+    seq_ids, seq_lengths = read_fasta_index(params.fna)
+    print(f"    {len(seq_ids)} sequences loaded for clustering.")
 
     print("\n--> Building similarity graph from ANI results...")
-    edges = load_ani_edges(
+    load_edges = load_ani_edges_raw if params.raw_ani else load_ani_edges
+    edges = load_edges(
         params.ani,
         min_ani=params.min_ani,
         min_qcov=params.min_qcov,
         min_tcov=params.min_tcov,
-        valid_ids=seq_lengths.keys(),
-    )
-    print(
-        f"    {sum(len(neigh) for neigh in edges.values()) // 2} edges retained "
-        "that meet thresholds."
+        valid_ids=seq_ids,
+        threads=params.threads,
     )
+    print(f"    {edges.num_edges} edges retained that meet thresholds.")
 
     print("\n--> Performing greedy clustering...")
     clusters = greedy_star_clustering(seq_lengths, edges)
@@ -311,43 +1173,31 @@ def run_pipeline(
         "-s",
         "90",
     ]
-    run_command(skani_command, "skani execution failed.")
+    run_command(
+        skani_command,
+        "skani execution failed.",
+        log_path=output_dir / "skani.log",
+    )
     print(f"✅ skani results saved to '{skani_output_path}'.")
 
-    print("\n--- Step 3: Reformatting skani output for clustering ---")
-    reformatted_ani_path = output_dir / "ani_formatted.txt"
-    format_skani_output(skani_output_path, reformatted_ani_path)
-    print(f"✅ Formatted ANI data saved to '{reformatted_ani_path}'.")
-
-    print("\n--- Step 4: Clustering genomes into vOTUs ---")
+    print("\n--- Step 3: Clustering genomes into vOTUs ---")
     cluster_path = output_dir / f"{prefix}_clusters.tsv"
     clustering_params = ClusteringParams(
         fna=all_fasta_path,
-        ani=reformatted_ani_path,
+        ani=skani_output_path,
         out=cluster_path,
         min_ani=min_ani,
         min_qcov=0.0,
         min_tcov=min_tcov,
+        raw_ani=True,
+        threads=threads,
     )
     clusters = perform_clustering(clustering_params)
 
-    print("\n--- Step 5: Generating final representative catalog ---")
-    representative_ids_path = output_dir / "representative_ids.txt"
-    write_representative_ids(representative_ids_path, clusters)
-
+    print("\n--- Step 4: Generating final representative catalog ---")
     final_fasta_path = output_dir / f"{prefix}_vOTU_catalog.fasta"
-    seqkit_command = [
-        "seqkit",
-        "grep",
-        "-f",
-        str(representative_ids_path),
-        str(all_fasta_path),
-        "-o",
-        str(final_fasta_path),
-    ]
-    run_command(seqkit_command, "seqkit grep failed.")
+    final_count = extract_representatives(all_fasta_path, clusters, final_fasta_path)
     print(f"✅ Final dereplicated catalog saved to '{final_fasta_path}'.")
 
-    final_count = count_fasta_records(final_fasta_path)
     print(f"\nTotal representative sequences in the final catalog: {final_count}")
     print("\n🎉 Workflow Complete! 🎉")
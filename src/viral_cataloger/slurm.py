@@ -3,13 +3,57 @@
 from __future__ import annotations
 
 import argparse
+from functools import lru_cache
+import os
 from pathlib import Path
+import shlex
 import sys
-from typing import Sequence
+from typing import Any, Iterable, List, Mapping, Sequence
 
+_SBATCH_TEMPLATE = """\
+#!/bin/bash
 
+#SBATCH --job-name={job_name}
+#SBATCH --time={time}
+#SBATCH --mem={mem}
+#SBATCH --cpus-per-task={cpus_per_task}
+#SBATCH --output={log_output}
+{optional_directives}
+# Exit on error
+set -e
+
+echo "Starting viral-cataloger job on $(hostname)"
+date
+
+viral-cataloger --input_dir {input_dir} --output_dir {output_dir} --threads {cpus_per_task} --min_ani {min_ani} --min_tcov {min_tcov} --prefix {prefix}
+
+echo "Job complete."
+date
+"""
+
+# Characters that keep their special meaning inside double quotes.
+_DOUBLE_QUOTE_SPECIAL = frozenset('"$`\\')
+
+
+@lru_cache(maxsize=256)
+def _shell_quote(value: str) -> str:
+    """Quote a command argument for the generated bash script.
+
+    Values without characters that expand inside double quotes keep the
+    readable ``"value"`` form; anything else goes through ``shlex.quote``.
+    """
+    if _DOUBLE_QUOTE_SPECIAL.isdisjoint(value):
+        return f'"{value}"'
+    return shlex.quote(value)
+
+
+@lru_cache(maxsize=1)
 def build_parser() -> argparse.ArgumentParser:
-    """Build the argument parser for Slurm generation."""
+    """Build the argument parser for Slurm generation.
+
+    The parser is built once and shared; ``parse_args`` does not modify it,
+    but callers must not add arguments to the returned instance.
+    """
     parser = argparse.ArgumentParser(
         description="Generate a Slurm batch script for viral-cataloger.",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
@@ -78,50 +122,129 @@ def build_parser() -> argparse.ArgumentParser:
     return parser
 
 
+# Options rendered into optional_directives rather than their own field.
+_OPTIONAL_DIRECTIVE_OPTIONS = frozenset(
+    {"partition", "account", "mail_user", "mail_type"}
+)
+# Pipeline arguments passed through the shell quoting helper.
+_QUOTED_FIELDS = frozenset({"input_dir", "output_dir", "prefix"})
+# Marks a per-job field in the shared render of a batch; CLI values cannot
+# contain NUL.
+_FIELD_MARK = "\0"
+
+
+def _optional_directives(values: Mapping[str, Any]) -> str:
+    """Return the ``#SBATCH`` lines for options that are set."""
+    # Optional directives are assembled separately so the template has no
+    # conditional lines.
+    optional = []
+    if values["partition"]:
+        optional.append(f"#SBATCH --partition={values['partition']}\n")
+    if values["account"]:
+        optional.append(f"#SBATCH --account={values['account']}\n")
+    if values["mail_user"]:
+        optional.append(f"#SBATCH --mail-user={values['mail_user']}\n")
+        optional.append(f"#SBATCH --mail-type={values['mail_type']}\n")
+    return "".join(optional)
+
+
+def _render_field(field: str, values: Mapping[str, Any]) -> str:
+    """Return the text substituted for ``field`` in ``_SBATCH_TEMPLATE``."""
+    if field == "optional_directives":
+        return _optional_directives(values)
+    if field in _QUOTED_FIELDS:
+        return _shell_quote(str(values[field]))
+    return str(values[field])
+
+
 def generate_sbatch(args: argparse.Namespace) -> str:
     """Construct the content of the sbatch file."""
-    lines = ["#!/bin/bash", ""]
-
-    # Slurm Directives
-    lines.append(f"#SBATCH --job-name={args.job_name}")
-    lines.append(f"#SBATCH --time={args.time}")
-    lines.append(f"#SBATCH --mem={args.mem}")
-    lines.append(f"#SBATCH --cpus-per-task={args.cpus_per_task}")
-    lines.append(f"#SBATCH --output={args.log_output}")
-
-    if args.partition:
-        lines.append(f"#SBATCH --partition={args.partition}")
-    if args.account:
-        lines.append(f"#SBATCH --account={args.account}")
-    if args.mail_user:
-        lines.append(f"#SBATCH --mail-user={args.mail_user}")
-        lines.append(f"#SBATCH --mail-type={args.mail_type}")
-
-    lines.append("")
-    lines.append("# Exit on error")
-    lines.append("set -e")
-    lines.append("")
-    lines.append("echo \"Starting viral-cataloger job on $(hostname)\"")
-    lines.append("date")
-    lines.append("")
-
-    # Construct command
-    cmd = [
-        "viral-cataloger",
-        "--input_dir", f'"{args.input_dir}"',
-        "--output_dir", f'"{args.output_dir}"',
-        "--threads", str(args.cpus_per_task),
-        "--min_ani", str(args.min_ani),
-        "--min_tcov", str(args.min_tcov),
-        "--prefix", f'"{args.prefix}"',
-    ]
-
-    lines.append(" ".join(cmd))
-    lines.append("")
-    lines.append("echo \"Job complete.\"")
-    lines.append("date")
-
-    return "\n".join(lines) + "\n"
+    values = vars(args)
+    return _SBATCH_TEMPLATE.format_map(
+        {
+            **values,
+            **{field: _render_field(field, values) for field in _QUOTED_FIELDS},
+            "optional_directives": _optional_directives(values),
+        }
+    )
+
+
+def _batch_file_names(
+    common: Mapping[str, Any], jobs: Sequence[Mapping[str, Any]]
+) -> List[str]:
+    """Return each job's sbatch file name, rejecting unsafe or repeated names."""
+    names = []
+    seen = set()
+    for overrides in jobs:
+        name = overrides.get("sbatch_file") or (
+            f"{overrides.get('job_name', common['job_name'])}.sbatch"
+        )
+        if name in {"", ".", ".."} or "/" in name or "\\" in name:
+            raise ValueError(f"sbatch file name must not be a path: {name!r}")
+        if name in seen:
+            raise ValueError(f"duplicate sbatch file name: {name!r}")
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def generate_sbatch_batch(
+    common_args: argparse.Namespace,
+    per_job_overrides: Iterable[Mapping[str, Any]],
+    out_dir: Path,
+) -> List[Path]:
+    """Write one sbatch file per job into ``out_dir``.
+
+    Each mapping overrides attributes of ``common_args`` (for example
+    ``job_name``, ``input_dir`` and ``output_dir``). Files are named after
+    the job's ``sbatch_file`` override, or ``<job_name>.sbatch``; names that
+    contain a path separator or repeat within the batch raise ``ValueError``
+    before any file is written.
+
+    The template is rendered and encoded once with the shared arguments,
+    leaving a marker for every field some job overrides; each job then
+    encodes only its own values and writes the joined bytes.
+    """
+    jobs = list(per_job_overrides)
+    common = vars(common_args)
+    names = _batch_file_names(common, jobs)
+
+    varying = set()
+    for overrides in jobs:
+        for key in overrides:
+            if key in _OPTIONAL_DIRECTIVE_OPTIONS:
+                varying.add("optional_directives")
+            elif key != "sbatch_file":
+                varying.add(key)
+    fields = {
+        field: _render_field(field, common)
+        for field in (*_QUOTED_FIELDS, "optional_directives")
+    }
+    fields.update((field, f"{_FIELD_MARK}{field}{_FIELD_MARK}") for field in varying)
+    # Even positions hold shared text, odd positions the per-job field names.
+    pieces: List[Any] = _SBATCH_TEMPLATE.format_map({**common, **fields}).split(
+        _FIELD_MARK
+    )
+    pieces[::2] = [text.encode("utf-8") for text in pieces[::2]]
+    slots = range(1, len(pieces), 2)
+    field_names = [pieces[slot] for slot in slots]
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for overrides, name in zip(jobs, names):
+        values = {**common, **overrides}
+        for slot, field in zip(slots, field_names):
+            pieces[slot] = _render_field(field, values).encode("utf-8")
+        path = out_dir / name
+        data = memoryview(b"".join(pieces))
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            while data:
+                data = data[os.write(fd, data) :]
+        finally:
+            os.close(fd)
+        written.append(path)
+    return written
 
 
 def main(argv: Sequence[str] | None = None) -> int:
@@ -133,7 +256,7 @@ def main(argv: Sequence[str] | None = None) -> int:
 
     output_path = Path(args.sbatch_file)
     try:
-        output_path.write_text(content, encoding="utf-8")
+        output_path.write_bytes(content.encode("utf-8"))
         print(f"✅ Generated Slurm script: {output_path}")
         print(f"   Submit with: sbatch {output_path}")
     except IOError as e:
@@ -1,6 +1,17 @@
 from pathlib import Path
 
-from viral_cataloger.pipeline import greedy_star_clustering, load_ani_edges, read_fasta_lengths
+import pytest
+
+from viral_cataloger import pipeline
+from viral_cataloger.pipeline import (
+    component_sizes,
+    connected_components,
+    format_skani_output,
+    greedy_star_clustering,
+    load_ani_edges,
+    load_ani_edges_raw,
+    read_fasta_lengths,
+)
 
 
 def test_greedy_star_clustering_avoids_chaining() -> None:
@@ -19,3 +30,130 @@ def test_greedy_star_clustering_avoids_chaining() -> None:
     assert "genome_a" in clusters
     assert clusters["genome_a"] == ["genome_a", "genome_b"]
     assert clusters["genome_c"] == ["genome_c"]
+
+
+@pytest.mark.parametrize("use_numba", [True, False])
+def test_connected_components_allow_chaining(monkeypatch, use_numba: bool) -> None:
+    if use_numba:
+        pytest.importorskip("numba")
+    else:
+        monkeypatch.setattr(pipeline, "_ccl_numba", None)
+    lengths = read_fasta_lengths(Path("tests/data/sample.fasta"))
+    edges = load_ani_edges(
+        Path("tests/data/ani_formatted.txt"),
+        min_ani=95.0,
+        min_qcov=85.0,
+        min_tcov=85.0,
+        valid_ids=lengths.keys(),
+    )
+
+    assert edges.num_edges == 2
+    assert connected_components(edges) == {
+        "genome_a": ["genome_a", "genome_b", "genome_c"]
+    }
+    assert component_sizes(edges) == [3]
+    assert component_sizes(edges, union_by_rank=False) == [3]
+
+
+def test_raw_skani_edges_match_formatted_edges() -> None:
+    lengths = read_fasta_lengths(Path("tests/data/sample.fasta"))
+    thresholds = {"min_ani": 95.0, "min_qcov": 85.0, "min_tcov": 85.0}
+    formatted = load_ani_edges(
+        Path("tests/data/ani_formatted.txt"), valid_ids=lengths.keys(), **thresholds
+    )
+    raw = load_ani_edges_raw(
+        Path("tests/data/skani_results.txt"), valid_ids=lengths.keys(), **thresholds
+    )
+
+    assert raw == formatted
+    assert greedy_star_clustering(lengths, raw) == greedy_star_clustering(
+        lengths, formatted
+    )
+
+
+def test_greedy_star_kernel_matches_python_fallback(monkeypatch) -> None:
+    pytest.importorskip("numba")
+    lengths = read_fasta_lengths(Path("tests/data/sample.fasta"))
+    edges = load_ani_edges(
+        Path("tests/data/ani_formatted.txt"),
+        min_ani=95.0,
+        min_qcov=85.0,
+        min_tcov=85.0,
+        valid_ids=lengths.keys(),
+    )
+    compiled = greedy_star_clustering(lengths, edges)
+    monkeypatch.setattr(pipeline, "_ccl_numba", None)
+
+    assert greedy_star_clustering(lengths, edges) == compiled
+
+
+def test_chunked_ani_parsing_matches_single_pass(monkeypatch) -> None:
+    pytest.importorskip("pandas")
+    lengths = read_fasta_lengths(Path("tests/data/sample.fasta"))
+    kwargs = {
+        "min_ani": 95.0,
+        "min_qcov": 85.0,
+        "min_tcov": 85.0,
+        "valid_ids": lengths.keys(),
+    }
+    expected = load_ani_edges(Path("tests/data/ani_formatted.txt"), **kwargs)
+    monkeypatch.setattr(pipeline, "_ANI_CHUNK_ROWS", 1)
+
+    chunked = load_ani_edges(Path("tests/data/ani_formatted.txt"), threads=2, **kwargs)
+
+    assert chunked == expected
+
+
+@pytest.mark.parametrize("use_pandas", [True, False])
+def test_raw_thresholds_use_two_decimal_percentages(
+    monkeypatch, tmp_path: Path, use_pandas: bool
+) -> None:
+    if use_pandas:
+        pytest.importorskip("pandas")
+    else:
+        monkeypatch.setattr(pipeline, "pd", None)
+    raw_path = tmp_path / "skani.txt"
+    raw_path.write_text(
+        "query\ttarget\tani\tqcov\ttcov\n"
+        "genome_a\tgenome_b\t94.996\t0.849951\t0.90\n"
+        "genome_b\tgenome_c\t96.0\t0.849949\t0.90\n",
+        encoding="utf-8",
+    )
+
+    edges = load_ani_edges_raw(
+        raw_path,
+        min_ani=95.0,
+        min_qcov=85.0,
+        min_tcov=85.0,
+        valid_ids=["genome_a", "genome_b", "genome_c"],
+    )
+
+    assert edges.num_edges == 1
+    assert list(edges.neighbors(0)) == [1]
+
+
+@pytest.mark.parametrize("use_pandas", [True, False])
+def test_raw_thresholds_round_ties_like_formatted_output(
+    monkeypatch, tmp_path: Path, use_pandas: bool
+) -> None:
+    if use_pandas:
+        pytest.importorskip("pandas")
+    else:
+        monkeypatch.setattr(pipeline, "pd", None)
+    raw_path = tmp_path / "skani.txt"
+    # "%.2f" writes 97.015 as 97.02, and 90.01 stays below a 90.015 minimum.
+    raw_path.write_text(
+        "query\ttarget\tani\tqcov\ttcov\n"
+        "genome_a\tgenome_b\t97.015\t0.90\t0.90\n"
+        "genome_b\tgenome_c\t90.01\t0.90\t0.90\n",
+        encoding="utf-8",
+    )
+    formatted_path = tmp_path / "formatted.tsv"
+    format_skani_output(raw_path, formatted_path)
+    ids = ["genome_a", "genome_b", "genome_c"]
+
+    for min_ani, expected in ((97.02, [[1], [0], []]), (90.015, [[1], [0], []])):
+        raw = load_ani_edges_raw(raw_path, min_ani, 85.0, 85.0, valid_ids=ids)
+        formatted = load_ani_edges(formatted_path, min_ani, 85.0, 85.0, valid_ids=ids)
+        assert [list(raw.neighbors(i)) for i in range(3)] == expected
+        assert raw == formatted
@@ -1,6 +1,23 @@
+import os
 from pathlib import Path
+import subprocess
+import sys
 
-from viral_cataloger.pipeline import format_skani_output, parse_fasta, read_fasta_lengths
+import pytest
+
+from viral_cataloger import _fastascan, pipeline
+from viral_cataloger.pipeline import (
+    aggregate_fastas,
+    count_fasta_records,
+    extract_representatives,
+    format_skani_output,
+    parse_fasta,
+    parse_fasta_arrays,
+    read_fasta_ids,
+    read_fasta_index,
+    read_fasta_lengths,
+    read_many_fasta_lengths,
+)
 
 
 def test_parse_fasta_sequences() -> None:
@@ -14,15 +31,175 @@ def test_parse_fasta_sequences() -> None:
     assert records[0][1].startswith("ATGCGTACGTA")
 
 
+def test_read_fasta_ids_matches_parsed_records() -> None:
+    fasta_path = Path("tests/data/sample.fasta")
+    records = list(parse_fasta(fasta_path))
+    assert list(read_fasta_ids(fasta_path)) == [record[0] for record in records]
+
+
+def test_parse_fasta_arrays_matches_records() -> None:
+    fasta_path = Path("tests/data/sample.fasta")
+    ids, offsets, sequences = parse_fasta_arrays(fasta_path)
+    records = [
+        (ids[i], sequences[offsets[i] : offsets[i + 1]].decode())
+        for i in range(len(ids))
+    ]
+    assert records == list(parse_fasta(fasta_path))
+    assert offsets[-1] == len(sequences)
+
+
+def test_parse_fasta_arrays_encodes_nucleotides(tmp_path: Path) -> None:
+    fasta_path = tmp_path / "mixed.fa"
+    fasta_path.write_bytes(b">genome_a\nACgt\nNa-\n")
+    _, offsets, codes = parse_fasta_arrays(fasta_path, encode=True)
+    assert list(offsets) == [0, 7]
+    assert bytes(codes) == bytes([0, 1, 2, 3, 4, 0, 4])
+
+
 def test_read_fasta_lengths() -> None:
     fasta_path = Path("tests/data/sample.fasta")
     lengths = read_fasta_lengths(fasta_path)
     assert lengths["genome_a"] > lengths["genome_b"] > lengths["genome_c"]
 
 
+def test_fasta_readers_accept_str_paths() -> None:
+    fasta_path = Path("tests/data/sample.fasta")
+    lengths = read_fasta_lengths(fasta_path)
+    assert read_fasta_lengths(str(fasta_path)) == lengths
+    assert list(read_fasta_ids(str(fasta_path))) == list(lengths)
+
+
+@pytest.mark.parametrize("use_extension", [True, False])
+def test_read_fasta_index_matches_parsed_records(
+    monkeypatch, use_extension: bool
+) -> None:
+    if use_extension:
+        pytest.importorskip("viral_cataloger._fastaparser")
+    else:
+        monkeypatch.setattr(_fastascan, "_fastaparser", None)
+    fasta_path = Path("tests/data/sample.fasta")
+    ids, lengths = read_fasta_index(fasta_path)
+    records = list(parse_fasta(fasta_path))
+    assert list(ids) == [seq_id for seq_id, _ in records]
+    assert list(lengths) == [len(seq) for _, seq in records]
+    assert count_fasta_records(fasta_path) == len(records)
+    assert ids.index_map() == {seq_id.encode(): i for i, seq_id in enumerate(ids)}
+    assert ids[-1] == records[-1][0]
+
+
+def test_read_fasta_lengths_cache_tracks_file_changes(tmp_path: Path) -> None:
+    fasta_path = tmp_path / "genomes.fa"
+    cache_path = tmp_path / "genomes.fa.lengths.tsv"
+    fasta_path.write_bytes(b">genome_a\nACGT\n>genome_b\nAC\n")
+    assert read_fasta_lengths(fasta_path, cache_path) == {"genome_a": 4, "genome_b": 2}
+    assert cache_path.exists()
+    assert read_fasta_lengths(fasta_path, cache_path) == {"genome_a": 4, "genome_b": 2}
+
+    fasta_path.write_bytes(b">genome_c\nACGTACGT\n")
+    assert read_fasta_lengths(fasta_path, cache_path) == {"genome_c": 8}
+
+
+def test_read_many_fasta_lengths(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(pipeline, "_PARALLEL_SCAN_MIN_BYTES", 0)
+    paths = [Path("tests/data/sample.fasta"), tmp_path / "other.fa"]
+    paths[1].write_bytes(b">genome_x\nACGTAC\n")
+    expected = {path: read_fasta_lengths(path) for path in paths}
+    assert read_many_fasta_lengths(paths, workers=2) == expected
+    assert read_many_fasta_lengths(paths, workers=1) == expected
+
+
 def test_format_skani_output(tmp_path: Path) -> None:
     skani_path = Path("tests/data/skani_results.txt")
     output_path = tmp_path / "formatted.tsv"
     format_skani_output(skani_path, output_path)
     lines = output_path.read_text(encoding="utf-8").strip().splitlines()
     assert lines[0].startswith("genome_a\tgenome_b\t1\t96.50\t90.00\t90.00")
+
+
+def test_format_skani_output_kernel_matches_fallback(
+    tmp_path: Path, monkeypatch
+) -> None:
+    pytest.importorskip("numba")
+    monkeypatch.setattr(pipeline, "_ANI_CHUNK_ROWS", 2)
+    skani_path = tmp_path / "skani.txt"
+    skani_path.write_text(
+        "query\ttarget\tani\tqcov\ttcov\n"
+        "génome_a\tgenome_b\t96.125\t0.90005\t1\n"
+        "genome_b\tgenome_c\t0\t0.285\t0.001\n"
+        "genome_c\tgenome_a\t99.995\t0.5\t0.12345\n"
+        "genome_b\tgenome_a\t50\t0.5\t0.5\n"
+        "genome_a\tgenome_c\t999999.999\t9999.99999\t9999.99999\n",
+        encoding="utf-8",
+    )
+    format_skani_output(skani_path, tmp_path / "kernel.tsv")
+    monkeypatch.setattr(pipeline, "_ccl_numba", None)
+    format_skani_output(skani_path, tmp_path / "fallback.tsv")
+    assert (tmp_path / "kernel.tsv").read_bytes() == (
+        tmp_path / "fallback.tsv"
+    ).read_bytes()
+
+
+def test_read_many_fasta_lengths_after_format_exits(tmp_path: Path) -> None:
+    # A parallel formatting kernel followed by a process pool used to leave
+    # the interpreter hanging at exit; run the sequence in a fresh process.
+    script = (
+        "from pathlib import Path\n"
+        "from viral_cataloger import pipeline\n"
+        "from viral_cataloger.pipeline import format_skani_output, "
+        "read_many_fasta_lengths\n"
+        "pipeline._PARALLEL_SCAN_MIN_BYTES = 0\n"
+        "format_skani_output(Path('tests/data/skani_results.txt'), "
+        f"Path({str(tmp_path / 'formatted.tsv')!r}))\n"
+        "print(read_many_fasta_lengths(['tests/data/sample.fasta'] * 2, "
+        "workers=2))\n"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        env=env,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    assert "genome_a" in result.stdout
+
+
+def test_aggregate_fastas_terminates_each_file(tmp_path: Path) -> None:
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    (input_dir / "a.fa").write_bytes(b">genome_a\nACGT")
+    (input_dir / "b.fasta").write_bytes(b">genome_b\nTTGG\n")
+    (input_dir / "c.fna").write_bytes(b"")
+    output_path = tmp_path / "all.fa"
+
+    fasta_files = aggregate_fastas(input_dir, output_path)
+
+    assert [path.name for path in fasta_files] == ["a.fa", "b.fasta", "c.fna"]
+    assert output_path.read_bytes() == b">genome_a\nACGT\n>genome_b\nTTGG\n"
+
+
+def test_extract_representatives(tmp_path: Path) -> None:
+    output_path = tmp_path / "catalog.fasta"
+    written = extract_representatives(
+        Path("tests/data/sample.fasta"), ["genome_a", "genome_c"], output_path
+    )
+
+    assert written == 2
+    records = list(parse_fasta(output_path))
+    assert [record[0] for record in records] == ["genome_a", "genome_c"]
+    assert records == [
+        record
+        for record in parse_fasta(Path("tests/data/sample.fasta"))
+        if record[0] != "genome_b"
+    ]
+
+
+def test_extract_representatives_matches_spaced_headers(tmp_path: Path) -> None:
+    fasta_path = tmp_path / "spaced.fasta"
+    fasta_path.write_bytes(b"> genome_x desc\nACGT\n>genome_y\nGG\n")
+    output_path = tmp_path / "catalog.fasta"
+
+    assert list(read_fasta_ids(fasta_path)) == ["genome_x", "genome_y"]
+    assert extract_representatives(fasta_path, ["genome_x"], output_path) == 1
+    assert output_path.read_bytes() == b"> genome_x desc\nACGT\n"
@@ -1,6 +1,13 @@
+import argparse
 import sys
 from unittest.mock import patch
-from viral_cataloger.slurm import build_parser, generate_sbatch, main
+import pytest
+from viral_cataloger.slurm import (
+    build_parser,
+    generate_sbatch,
+    generate_sbatch_batch,
+    main,
+)
 
 def test_generate_sbatch_content():
     parser = build_parser()
@@ -21,6 +28,17 @@ def test_generate_sbatch_content():
     assert '--threads 16' in content
     assert '--input_dir "data/in"' in content
 
+def test_generate_sbatch_quotes_shell_metacharacters():
+    args = build_parser().parse_args([
+        "--input_dir", "data/$RUN",
+        "--output_dir", "data/it's out",
+    ])
+
+    content = generate_sbatch(args)
+
+    assert "--input_dir 'data/$RUN'" in content
+    assert '--output_dir "data/it\'s out"' in content
+
 def test_slurm_main(tmp_path):
     sbatch_file = tmp_path / "test.sbatch"
     argv = [
@@ -39,3 +57,51 @@ def test_slurm_main(tmp_path):
     content = sbatch_file.read_text(encoding="utf-8")
     assert "#SBATCH" in content
     assert '--input_dir "in"' in content
+
+def test_generate_sbatch_batch(tmp_path):
+    common = build_parser().parse_args(["--input_dir", "in", "--output_dir", "out"])
+    jobs = [
+        {"job_name": "site_a", "input_dir": "in/a", "output_dir": "out/a"},
+        {"job_name": "site_b", "input_dir": "in/b", "output_dir": "out/b"},
+    ]
+
+    paths = generate_sbatch_batch(common, jobs, tmp_path / "jobs")
+
+    assert [path.name for path in paths] == ["site_a.sbatch", "site_b.sbatch"]
+    content = paths[1].read_text(encoding="utf-8")
+    assert "#SBATCH --job-name=site_b" in content
+    assert '--input_dir "in/b"' in content
+    assert common.job_name == "viral_cat"
+
+
+def test_generate_sbatch_batch_matches_single_renders(tmp_path):
+    common = build_parser().parse_args(
+        ["--input_dir", "in", "--output_dir", "out", "--cpus-per-task", "8"]
+    )
+    jobs = [
+        {"job_name": "site_a", "input_dir": "in/$a", "partition": "gpu"},
+        {"job_name": "site_b", "cpus_per_task": 2, "sbatch_file": "b.sh"},
+    ]
+
+    paths = generate_sbatch_batch(common, jobs, tmp_path)
+
+    for path, overrides in zip(paths, jobs):
+        job = argparse.Namespace(**{**vars(common), **overrides})
+        assert path.read_text(encoding="utf-8") == generate_sbatch(job)
+
+
+@pytest.mark.parametrize(
+    "jobs",
+    [
+        [{"job_name": "../escape"}],
+        [{"job_name": "a", "sbatch_file": "sub/a.sbatch"}],
+        [{"job_name": "a"}, {"job_name": "b", "sbatch_file": "a.sbatch"}],
+    ],
+)
+def test_generate_sbatch_batch_rejects_unsafe_names(tmp_path, jobs):
+    common = build_parser().parse_args(["--input_dir", "in", "--output_dir", "out"])
+
+    with pytest.raises(ValueError):
+        generate_sbatch_batch(common, jobs, tmp_path / "jobs")
+
+    assert not (tmp_path / "jobs").exists()